@@ -0,0 +1,187 @@
+# bench_cluster.py
+# benchmark the clustering paths on synthetic fingerprints
+# records time, peak memory and CU per (bench, n, d, m, card, dup)
+# and can compare a run against a stored baseline
+#
+#   python bench_cluster.py --n 1000,10000 --m 3,5 --out base.json
+#   python bench_cluster.py --n 1000,10000 --m 3,5 --compare base.json
+
+import argparse
+import json
+import sys
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from cat_cluster import cat_utility, cat_utility_np, cluster, \
+  cluster_unique
+from cat_kmeans import kmeans
+
+# cardinality profile of the fingerprint schema (FEATURES order):
+# an int is a fixed number of values, a float a fraction of n
+# (scaled by --card), 'zipf' columns are skewed like real traffic
+PROFILE = [
+  (2, 'flat'),       # cookies_enabled
+  (6, 'zipf'),       # device_memory
+  (7, 'zipf'),       # hardware_concurrency
+  (0.9, 'flat'),     # ip, near unique
+  (12, 'zipf'),      # languages
+  (2, 'flat'),       # local_storage
+  (12, 'zipf'),      # platform
+  (2, 'flat'),       # session_storage
+  (0.05, 'zipf'),    # timezone
+  (2, 'flat'),       # touch_support
+  (6, 'zipf'),       # browser
+  (0.04, 'zipf'),    # browser_version
+  (0.05, 'zipf'),    # gpu
+  (0.8, 'flat'),     # hash, near unique
+]
+
+def synth_fingerprints(n, d=len(PROFILE), card=1.0, dup=0.0, seed=0):
+  # (n, d) int array of codes shaped like the fingerprint schema;
+  # d > len(PROFILE) cycles the profile, card scales the columns
+  # sized by n, dup is the fraction of rows copied from earlier rows
+  rng = np.random.RandomState(seed)
+  X = np.empty((n, d), dtype=np.int64)
+  for i in range(d):
+    size, dist = PROFILE[i % len(PROFILE)]
+    if isinstance(size, float):
+      size = max(2, int(size * card * n))
+    if dist == 'zipf':
+      p = 1.0 / np.arange(1, size + 1)
+      X[:, i] = rng.choice(size, n, p=p / p.sum())
+    else:
+      X[:, i] = rng.randint(0, size, n)
+  n_dup = int(dup * n)
+  if n_dup and n > 1:
+    rows = rng.choice(np.arange(1, n), n_dup, replace=False)
+    X[rows] = X[rng.randint(0, rows)]  # copy some earlier row
+  return X
+
+def _measure(fn, repeat=5):
+  # (result, per-call seconds of each timing loop, peak bytes
+  # traced during fn); each of the repeat loops runs fn enough
+  # times to take 0.2s (timeit's autorange), so millisecond benches
+  # aren't single noisy calls; tracemalloc slows pure-Python code
+  # several times over, so the peak comes from a separate traced call
+  result = fn()  # warm-up, and the result
+  timer = timeit.Timer(fn)
+  number, total = timer.autorange()
+  times = [total] + timer.repeat(max(repeat - 1, 0), number)
+  tracemalloc.start()
+  fn()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return result, [t / number for t in times], peak
+
+def _benches(X, m):
+  # name -> function returning the CU it reached
+  ds = X.tolist()
+  labels = [i % m for i in range(len(ds))]
+  return {
+    'cat_utility': lambda: cat_utility(ds, labels, m),
+    'cat_utility_np': lambda: cat_utility_np(X, labels, m),
+    'cluster': lambda: cat_utility_np(X, cluster(ds, m), m),
+    'cluster_unique': lambda: cat_utility_np(X, cluster_unique(ds, m), m),
+    'kmeans': lambda: cat_utility_np(X, kmeans(X, m, seed=0)[0], m),
+  }
+
+def run(ns, ds, ms, cards, dups, benches=None, repeat=5, seed=0):
+  # one record per configuration: median, min and max per-call
+  # time over repeat timing loops
+  records = []
+  for n in ns:
+    for d in ds:
+      for card in cards:
+        for dup in dups:
+          X = synth_fingerprints(n, d, card, dup, seed)
+          for m in ms:
+            for name, fn in sorted(_benches(X, m).items()):
+              if benches and name not in benches:
+                continue
+              cu, times, peak = _measure(fn, repeat)
+              best = {'bench': name, 'n': n, 'd': d, 'm': m,
+                'card': card, 'dup': dup,
+                'seconds': float(np.median(times)),
+                'seconds_min': min(times), 'seconds_max': max(times),
+                'peak_bytes': peak, 'cu': float(cu)}
+              records.append(best)
+              print('%-15s n=%-7d d=%-3d m=%-3d card=%-5g dup=%-5g '
+                '%9.4fs %9.1f MB  cu=%.4f' % (name, n, d, m, card, dup,
+                best['seconds'], best['peak_bytes'] / 2.0 ** 20,
+                best['cu']))
+  return records
+
+def _key(r):
+  return (r['bench'], r['n'], r['d'], r['m'], r['card'], r['dup'])
+
+# absolute growth always tolerated, below which differences are
+# timer or allocator noise rather than regressions
+NOISE = {'seconds': 0.005, 'peak_bytes': 1 << 16}
+
+def _spread(r, field):
+  # (lowest, highest) measurement behind a record's field
+  if field == 'seconds':
+    return r.get('seconds_min', r[field]), r.get('seconds_max', r[field])
+  return r[field], r[field]
+
+def compare(records, baseline, tol=0.2, cu_tol=1e-9, noise=NOISE):
+  # regressions of records against baseline records: time (median)
+  # or peak memory more than tol (fraction) and more than
+  # noise[field] above baseline, with even the fastest timing loop
+  # slower than the baseline's slowest; or lower CU
+  base = dict((_key(r), r) for r in baseline)
+  found = []
+  for r in records:
+    b = base.get(_key(r))
+    if b is None:
+      continue
+    for field in ('seconds', 'peak_bytes'):
+      if r[field] > b[field] * (1.0 + tol) and \
+        r[field] - b[field] > noise[field] and \
+        _spread(r, field)[0] > _spread(b, field)[1]:
+        found.append((_key(r), field, b[field], r[field]))
+    if r['cu'] < b['cu'] - cu_tol:
+      found.append((_key(r), 'cu', b['cu'], r['cu']))
+  return found
+
+def _list(s, kind):
+  return [kind(v) for v in s.split(',')]
+
+def main():
+  p = argparse.ArgumentParser(description='clustering benchmarks')
+  p.add_argument('--n', default='1000,5000', help='row counts')
+  p.add_argument('--d', default='14', help='attribute counts')
+  p.add_argument('--m', default='3,5', help='cluster counts')
+  p.add_argument('--card', default='1.0', help='cardinality scales')
+  p.add_argument('--dup', default='0.3', help='duplicate row fractions')
+  p.add_argument('--bench', default=None, help='only these benches')
+  p.add_argument('--repeat', type=int, default=5,
+    help='timing loops per bench')
+  p.add_argument('--seed', type=int, default=0)
+  p.add_argument('--out', default='bench_output.json')
+  p.add_argument('--compare', default=None, help='baseline json')
+  p.add_argument('--tol', type=float, default=0.2,
+    help='allowed time/memory growth over baseline (fraction)')
+  args = p.parse_args()
+
+  records = run(_list(args.n, int), _list(args.d, int),
+    _list(args.m, int), _list(args.card, float), _list(args.dup, float),
+    args.bench and args.bench.split(','), args.repeat, args.seed)
+  with open(args.out, 'w') as f:
+    json.dump(records, f, indent=1)
+  print("\nResults written to %s " % args.out)
+
+  if args.compare:
+    with open(args.compare) as f:
+      found = compare(records, json.load(f), args.tol)
+    for key, field, was, now in found:
+      print("REGRESSION %s %s: %g -> %g" % (key, field, was, now))
+    if found:
+      sys.exit(1)
+    print("No regressions against %s " % args.compare)
+
+if __name__ == "__main__":
+  main()
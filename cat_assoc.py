@@ -0,0 +1,100 @@
+# cat_assoc.py
+# association between categorical attributes: Cramer's V and mutual
+# information for every pair, from contingency tables built with
+# combined-code counts over the encoded matrix
+
+import numpy as np
+import pandas as pd
+
+DENSE_MAX = 1 << 20  # larger tables are counted sparsely (np.unique)
+BLOCK = 1 << 22  # combined codes per counting pass, about n * pairs
+
+def _cells(keys, size):
+  # non-zero counts of combined codes in [0, size); returns
+  # (keys, counts), keys sorted
+  if size <= DENSE_MAX:
+    cts = np.bincount(keys, minlength=size)
+    keys = np.flatnonzero(cts)
+    return keys, cts[keys]
+  return np.unique(keys, return_counts=True)
+
+def _blocks(sizes, n, block):
+  # groups of pair indices counted together: pairs with small
+  # tables share a pass, at most block // n pairs and DENSE_MAX
+  # cells so one bincount still counts them; a large table gets a
+  # pass of its own, counted with np.unique, since sorting many of
+  # them together costs more than it saves
+  per = max(1, block // max(n, 1))
+  groups = [[p] for p in np.flatnonzero(sizes > DENSE_MAX)]
+  group, total = [], 0
+  for p in np.flatnonzero(sizes <= DENSE_MAX):
+    if group and (len(group) == per or total + sizes[p] > DENSE_MAX):
+      groups.append(group)
+      group, total = [], 0
+    group.append(p)
+    total += sizes[p]
+  if group:
+    groups.append(group)
+  return groups
+
+def association(X, columns=None, block=BLOCK):
+  # Cramer's V and mutual information (nats) of every pair of
+  # columns of an (n, d) code matrix, as two d x d DataFrames
+  # both only need the non-zero cells of each table:
+  #   chi2 = n * (sum_ab n_ab^2 / (n_a * n_b) - 1)
+  #   V    = sqrt(chi2 / n / (min(r, c) - 1)), r, c observed values
+  #   MI   = sum_ab p_ab * log(p_ab / (p_a * p_b))
+  # the tables of a block of pairs are counted in one pass: each
+  # pair's cells a * card_b + b are shifted past the previous pairs'
+  # tables, so one bincount (or np.unique) covers the whole block
+  X = np.asarray(X, dtype=np.int64)
+  n, d = X.shape
+  if columns is None:
+    columns = list(range(d))
+  cards = X.max(axis=0) + 1
+  margins = [np.bincount(X[:, i], minlength=cards[i]) for i in range(d)]
+  observed = np.array([np.count_nonzero(c) for c in margins])
+  marg = np.concatenate(margins).astype(np.float64)
+  moff = np.concatenate(([0], np.cumsum(cards)[:-1]))  # margin offsets
+
+  V = np.eye(d)
+  MI = np.zeros((d, d))
+  for i in range(d):
+    p = margins[i][margins[i] > 0] / n
+    MI[i, i] = -np.sum(p * np.log(p))  # entropy
+    if observed[i] < 2:
+      V[i, i] = 0.0
+
+  # one contiguous row per column; int32 combined codes where a
+  # block's tables fit, halving the memory traffic of the pass
+  XT = np.ascontiguousarray(X.T)
+  XT32 = XT.astype(np.int32) if cards.max() < 2 ** 31 else XT
+  I, J = np.triu_indices(d, 1)
+  for group in _blocks(cards[I] * cards[J], n, block):
+    bi, bj = I[group], J[group]
+    cb = cards[bj]
+    sizes = cards[bi] * cb
+    off = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    total = int(sizes.sum())
+    Z = XT32 if total < 2 ** 31 else XT
+    keys, cts = _cells((off[:, None].astype(Z.dtype) +
+      Z[bi] * cb[:, None].astype(Z.dtype) + Z[bj]).ravel(), total)
+    if len(group) == 1:
+      pair = np.zeros(len(keys), dtype=np.intp)
+    else:
+      pair = np.searchsorted(off, keys, side='right') - 1
+    cell = keys - off[pair]
+    na = marg[moff[bi[pair]] + cell // cb[pair]]
+    nb = marg[moff[bj[pair]] + cell % cb[pair]]
+    cts = cts.astype(np.float64)
+
+    phi2 = np.maximum(np.bincount(pair, cts * cts / (na * nb),
+      minlength=len(bi)) - 1.0, 0.0)
+    k = np.minimum(observed[bi], observed[bj]) - 1
+    V[bi, bj] = V[bj, bi] = np.where(k > 0,
+      np.sqrt(phi2 / np.maximum(k, 1)), 0.0)
+    MI[bi, bj] = MI[bj, bi] = np.bincount(pair,
+      cts / n * np.log(cts * n / (na * nb)), minlength=len(bi))
+
+  return (pd.DataFrame(V, index=columns, columns=columns),
+    pd.DataFrame(MI, index=columns, columns=columns))
@@ -2,21 +2,76 @@
 # cluster non-numeric items using category utility
 # Anaconda 4.1.1 (Python 3.5)
 
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
-def cat_utility(ds, clustering, m):
+from cat_encoder import FEATURES, CatEncoder
+
+SPARSE_MIN = 64  # atts with this many values are counted sparsely
+
+class Probe(object):
+  # optional instrumentation, passed as probe= to cat_utility(),
+  # cat_utility_np() and cluster(); with probe=None (the default)
+  # the hot paths only pay an 'is not None' test
+  # seconds[phase] and counts[name] accumulate across calls;
+  # callback(i, k, cu) runs after every `every`-th greedy step of
+  # cluster() with the item index, its cluster and the CU so far,
+  # and stops the run early by returning a true value
+
+  def __init__(self, callback=None, every=1):
+    if every < 1:
+      raise ValueError('every must be at least 1, got %r' % (every,))
+    self.callback = callback
+    self.every = every
+    self.seconds = {}
+    self.counts = {}
+    self.stopped = False
+
+  def tick(self, phase, start):
+    # add time since start (a perf_counter() value) to phase,
+    # returns now so consecutive phases can chain
+    now = time.perf_counter()
+    self.seconds[phase] = self.seconds.get(phase, 0.0) + now - start
+    return now
+
+  def count(self, name, k=1):
+    self.counts[name] = self.counts.get(name, 0) + k
+
+  def step(self, i, k, eng):
+    # per-step hook of cluster(); True means stop
+    if self.callback is not None and i % self.every == 0:
+      if self.callback(i, k, eng.running_cu()):
+        self.stopped = True
+    return self.stopped
+
+  def report(self):
+    return {'seconds': dict(self.seconds), 'counts': dict(self.counts)}
+
+def cat_utility(ds, clustering, m, weights=None, probe=None):
   # category utility of clustering of dataset ds
+  # weights[ni] counts item ni that many times (default 1 each)
+  # probe (a Probe) times the 'count' and 'sum_sq' phases
+  if probe is not None:
+    probe.count('cat_utility')
+    t = time.perf_counter()
   n = len(ds)  # number items
   d = len(ds[0])  # number attributes/dimensions
+  if weights is None:
+    weights = [1] * n
 
   # get number items in each cluster
   cluster_cts = [0] * m  # [0,0]
+  nw = 0  # total weight, used in place of n
   for ni in range(n):  # each item
     k = clustering[ni]
-    cluster_cts[k] += 1
+    cluster_cts[k] += weights[ni]
+    nw += weights[ni]
 
   for i in range(m): 
     if cluster_cts[i] == 0:   # a cluster has no items
+      if probe is not None: probe.tick('count', t)
       return 0.0
 
   # get number unique values, each att
@@ -37,7 +92,7 @@ def cat_utility(ds, clustering, m):
     cts = [0] * unique_vals[i] 
     for ni in range(n):  # each data item
       v = ds[ni][i]
-      cts[v] += 1
+      cts[v] += weights[ni]
     att_cts.append(cts)
 
   # get number of each value in each att, each cluster
@@ -51,16 +106,20 @@ def cat_utility(ds, clustering, m):
       for ni in range(n):  # each data item
         if clustering[ni] != k: continue  # wrong cluster
         v = ds[ni][i]
-        cts[v] += 1
+        cts[v] += weights[ni]
       a_cts.append(cts)
     k_cts.append(a_cts) 
 
+  if probe is not None:
+    probe.count('count_cells', (m + 1) * int(np.sum(unique_vals)))
+    t = probe.tick('count', t)
+
   # uncoditional sum squared probs (right summation)
   un_sum_sq = 0.0 
   for i in range(d):  
     for j in range(len(att_cts[i])):
-      un_sum_sq += (1.0 * att_cts[i][j] / n) \
-      * (1.0 * att_cts[i][j] / n) 
+      un_sum_sq += (1.0 * att_cts[i][j] / nw) \
+      * (1.0 * att_cts[i][j] / nw) 
 
   # conditional sum, each cluster (left summation)
   cond_sum_sq = [0.0] * m  
@@ -76,7 +135,7 @@ def cat_utility(ds, clustering, m):
   # P(C)
   prob_c = [0.0] * m  # [0.0, 0.0]
   for k in range(m):  # each cluster
-    prob_c[k] = (1.0 * cluster_cts[k]) / n
+    prob_c[k] = (1.0 * cluster_cts[k]) / nw
   
   # put it all together
   left = 1.0 / m
@@ -84,44 +143,516 @@ def cat_utility(ds, clustering, m):
   for k in range(m):
     right += prob_c[k] * (cond_sum_sq[k] - un_sum_sq)
   cu = left * right
+  if probe is not None: probe.tick('sum_sq', t)
   return cu
 
-def cluster(ds, m):
+def _sum_sq_counts(groups, X, unique_vals, n_groups, sparse, weights):
+  # sum over atts and values of count(group, att, value)^2, for
+  # each group id in groups; X holds only the atts to count
+  # and weights (or None) gives each item's count
+  if X.shape[1] == 0:
+    return np.zeros(n_groups)
+  # give every (att, value) pair its own slot, att by att
+  # ex: unique_vals [3, 3, 2] -> offsets [0, 3, 6], 8 slots
+  offsets = np.concatenate(([0], np.cumsum(unique_vals)[:-1]))
+  n_slots = int(unique_vals.sum())
+  keys = groups[:, :, None] * n_slots + (X + offsets)[None, :, :]
+  if weights is not None:
+    weights = np.broadcast_to(weights[None, :, None], keys.shape).ravel()
+  keys = keys.ravel()
+  if not sparse:
+    cts = np.bincount(keys, weights, minlength=n_groups * n_slots)
+    cts = cts.reshape(n_groups, n_slots).astype(np.float64)
+    return np.sum(cts * cts, axis=1)
+  if weights is None:
+    keys, cts = np.unique(keys, return_counts=True)
+  else:
+    keys, inverse = np.unique(keys, return_inverse=True)
+    cts = np.bincount(inverse, weights)
+  cts = cts.astype(np.float64)
+  return np.bincount(keys // n_slots, weights=cts * cts,
+    minlength=n_groups)
+
+def cat_utility_np(ds, clustering, m, weights=None, probe=None):
+  # vectorized cat_utility(): same value, counts built with
+  # np.bincount on the int-encoded 2-D array (np.unique for atts
+  # with SPARSE_MIN or more values)
+  # clustering is one label list, or an (n_candidates x n)
+  # array of labels to score a batch of clusterings in one
+  # call; returns a float or an array of n_candidates floats
+  # weights, as in cat_utility(), counts each item that many times
+  # probe (a Probe) times the 'count' and 'sum_sq' phases
+  if probe is not None:
+    probe.count('cat_utility_np')
+    t = time.perf_counter()
+  X = np.asarray(ds, dtype=np.int64)
+  n, d = X.shape  # number items, number attributes
+  if weights is not None:
+    weights = np.asarray(weights, dtype=np.float64)
+    nw = weights.sum()
+  else:
+    nw = n
+  labels = np.asarray(clustering, dtype=np.int64)
+  single = labels.ndim == 1
+  labels = labels.reshape(-1, n)
+  c = labels.shape[0]  # number candidate clusterings
+
+  # get number items in each cluster, each candidate
+  groups = np.arange(c)[:, None] * m + labels  # candidate-cluster ids
+  w = None if weights is None else np.tile(weights, c)
+  cluster_cts = np.bincount(groups.ravel(), w,
+    minlength=c * m).reshape(c, m)
+
+  # number of each value in each att (att_cts, all atts)
+  unique_vals = X.max(axis=0) + 1
+  un_sum_sq = 0.0
+  for i in range(d):
+    att_cts = np.bincount(X[:, i], weights, minlength=unique_vals[i])
+    un_sum_sq += np.sum((att_cts / nw) ** 2)
+
+  # sum of squared counts of each value in each att, each cluster,
+  # each candidate; low-cardinality atts are counted densely,
+  # the rest sparsely so only non-zero counts are materialized
+  dense = unique_vals < SPARSE_MIN
+  k_sum_sq = _sum_sq_counts(groups, X[:, dense], unique_vals[dense],
+    c * m, False, weights)
+  k_sum_sq += _sum_sq_counts(groups, X[:, ~dense], unique_vals[~dense],
+    c * m, True, weights)
+  k_sum_sq = k_sum_sq.reshape(c, m)
+  if probe is not None: t = probe.tick('count', t)
+
+  # conditional sum, each cluster (left summation)
+  safe_cts = np.where(cluster_cts > 0, cluster_cts, 1)
+  cond_sum_sq = k_sum_sq / (safe_cts * safe_cts)
+
+  prob_c = cluster_cts / nw  # P(C)
+  cu = np.sum(prob_c * (cond_sum_sq - un_sum_sq), axis=1) / m
+  cu[np.any(cluster_cts == 0, axis=1)] = 0.0  # a cluster has no items
+  if probe is not None: probe.tick('sum_sq', t)
+
+  if single:
+    return float(cu[0])
+  return cu
+
+def _bump(tables, i, v, w):
+  # add w to tables[i][v], returns the count before the update
+  # a count table is a dense list indexed by code while its codes
+  # stay below SPARSE_MIN, and is swapped for a {code: count} dict
+  # of the non-zero counts once a higher code shows up, so
+  # near-unique attributes (ip, hash) cost O(non-zeros) per cluster
+  cts = tables[i]
+  if type(cts) is list:
+    if v < len(cts):
+      old = cts[v]
+      cts[v] = old + w
+      return old
+    if v < SPARSE_MIN:
+      cts.extend([0] * (v + 1 - len(cts)))
+      cts[v] = w
+      return 0
+    cts = tables[i] = dict((j, c) for j, c in enumerate(cts) if c)
+  old = cts.get(v, 0)
+  if old + w:
+    cts[v] = old + w
+  else:
+    del cts[v]
+  return old
+
+def _nonzero(cts):
+  # non-zero counts of a count table in code order
+  if type(cts) is list:
+    return [c for c in cts if c]
+  return [cts[v] for v in sorted(cts)]
+
+_TIE_TOL = 1e-12  # CU gap treated as a float tie
+
+class CUEngine(object):
+  # incremental category utility state for a clustering
+  # keeps the counts cat_utility() rebuilds on every call:
+  # cluster_cts, att_cts, k_cts, plus the running sums of
+  # squared counts, so adding one item costs O(d) and
+  # scoring all m placements of an item costs O(m*d)
+  #
+  # CU = 1/m * sum_k P(C_k) * (sum_ij P(A_i=V_ij|C_k)^2 - sum_ij P(A_i=V_ij)^2)
+  #    = 1/(m*n) * (sum_k k_sum_sq[k] / cluster_cts[k] - un_sum_sq / n)
+
+  def __init__(self, m, d):
+    self.m = m  # number clusters
+    self.d = d  # number attributes/dimensions
+    self.n = 0  # number items added (total weight)
+    self.cluster_cts = [0] * m
+    self.att_cts = [[] for i in range(d)]
+    self.k_cts = [[[] for i in range(d)] for k in range(m)]
+    self.k_sum_sq = [0] * m  # sum squared counts, each cluster
+    self.un_sum_sq = 0       # sum squared counts, all items
+    self.probe = None        # Probe counting tie re-scores, if any
+
+  @classmethod
+  def from_clustering(cls, ds, clustering, m, weights=None):
+    eng = cls(m, len(ds[0]))
+    for ni in range(len(ds)):
+      eng.add(ds[ni], clustering[ni],
+        1 if weights is None else weights[ni])
+    return eng
+
+  def add(self, item, k, w=1):
+    # put item in cluster k, counted w times
+    # (c+w)^2 - c^2 = 2cw + w^2
+    a_cts = self.k_cts[k]
+    ww = w * w
+    for i in range(self.d):
+      v = item[i]
+      self.un_sum_sq += 2 * w * _bump(self.att_cts, i, v, w) + ww
+      self.k_sum_sq[k] += 2 * w * _bump(a_cts, i, v, w) + ww
+    self.cluster_cts[k] += w
+    self.n += w
+
+  def remove(self, item, k, w=1):
+    # take item (counted w times) out of cluster k
+    # (c-w)^2 - c^2 = -2cw + w^2
+    a_cts = self.k_cts[k]
+    ww = w * w
+    for i in range(self.d):
+      v = item[i]
+      self.un_sum_sq += ww - 2 * w * _bump(self.att_cts, i, v, -w)
+      self.k_sum_sq[k] += ww - 2 * w * _bump(a_cts, i, v, -w)
+    self.cluster_cts[k] -= w
+    self.n -= w
+
+  def _overlap(self, item, k):
+    # sum over atts of the count of item's value in cluster k
+    a_cts = self.k_cts[k]
+    tot = 0
+    for i in range(self.d):
+      v = item[i]
+      cts = a_cts[i]
+      if type(cts) is dict: tot += cts.get(v, 0)
+      elif v < len(cts): tot += cts[v]
+    return tot
+
+  def gain(self, item, k, w=1):
+    # change in sum_k k_sum_sq[k] / cluster_cts[k] from adding
+    # item (w times) to non-empty cluster k, as an exact (num, den)
+    # pair; proportional to the change in CU, same for every k
+    nk = self.cluster_cts[k]
+    sk = self.k_sum_sq[k]
+    new_sum = sk + 2 * w * self._overlap(item, k) + self.d * w * w
+    return new_sum * nk - sk * (nk + w), nk * (nk + w)
+
+  def running_cu(self):
+    # CU from the running sums in O(m), equal to cu() up to float
+    # rounding; cheap enough to report after every step
+    n = self.n
+    if 0 in self.cluster_cts or n == 0:
+      return 0.0
+    tot = 0.0
+    for k in range(self.m):
+      tot += (1.0 * self.k_sum_sq[k]) / self.cluster_cts[k]
+    return (tot - (1.0 * self.un_sum_sq) / n) / (self.m * n)
+
+  def n_cells(self):
+    # number of count cells held (list slots + dict entries)
+    tot = sum(len(cts) for cts in self.att_cts)
+    for a_cts in self.k_cts:
+      tot += sum(len(cts) for cts in a_cts)
+    return tot
+
+  def cells(self):
+    # per att the non-zero value-in-cluster counts as sorted
+    # (keys, cts) arrays, key = v*m + k, for overlaps()
+    att = []
+    for i in range(self.d):
+      keys = []
+      cts = []
+      for k in range(self.m):
+        t = self.k_cts[k][i]
+        for v, c in (enumerate(t) if type(t) is list else t.items()):
+          if c:
+            keys.append(v * self.m + k)
+            cts.append(c)
+      keys = np.array(keys, dtype=np.int64)
+      order = np.argsort(keys)
+      att.append((keys[order], np.array(cts)[order]))
+    return att
+
+  def cu(self):
+    # same value as cat_utility() on the items added so far,
+    # summed in the same order so the floats match bit for bit
+    # (zero counts add 0.0 and are skipped, so sparse tables only
+    # touch their non-zero entries)
+    m = self.m
+    n = self.n
+    for k in range(m):
+      if self.cluster_cts[k] == 0:  # a cluster has no items
+        return 0.0
+
+    un_sum_sq = 0.0
+    for cts in self.att_cts:
+      for c in _nonzero(cts):
+        un_sum_sq += (1.0 * c / n) * (1.0 * c / n)
+
+    left = 1.0 / m
+    right = 0.0
+    for k in range(m):
+      nk = self.cluster_cts[k]
+      sum = 0.0
+      for cts in self.k_cts[k]:
+        for c in _nonzero(cts):
+          sum += (1.0 * c / nk) * (1.0 * c / nk)
+      right += ((1.0 * nk) / n) * (sum - un_sum_sq)
+    return left * right
+
+  def place(self, item, w=1):
+    # streaming version of one cluster() step: the first m items
+    # seed clusters 0 .. m-1, later ones go to the best cluster
+    # returns the cluster item was added to
+    if 0 in self.cluster_cts:
+      k = self.cluster_cts.index(0)
+    else:
+      k = self.best_cluster(item, w)
+    self.add(item, k, w)
+    return k
+
+  def proposed_cu(self, item, k, w=1):
+    # CU if item were put in cluster k, leaves the state unchanged
+    self.add(item, k, w)
+    cu = self.cu()
+    self.remove(item, k, w)
+    return cu
+
+  def best_cluster(self, item, w=1):
+    # cluster whose CU would be highest after adding item,
+    # first one on ties, like np.argmax over proposed CUs
+    # item is not added; call add() to commit
+    m = self.m
+    cts = self.cluster_cts
+
+    if 0 in cts:
+      # a proposal scores 0.0 unless it fills the last empty
+      # cluster; rare (only while seeding), score each in full
+      cus = [self.proposed_cu(item, k, w) for k in range(m)]
+      return cus.index(max(cus))
+
+    # only the k-th term of sum_k k_sum_sq[k] / cluster_cts[k]
+    # changes, so the k-th proposal's gain is an exact fraction
+    nums = [0] * m
+    dens = [1] * m
+    best = 0
+    for k in range(m):
+      nums[k], dens[k] = self.gain(item, k, w)
+      if nums[k] * dens[best] > nums[best] * dens[k]:
+        best = k
+
+    # cat_utility() sums floats, so proposals tied (or nearly) in
+    # exact arithmetic can come out in either order; break those
+    # ties on the float CU to pick what cluster() always picked
+    scale = 1.0 / (m * (self.n + w))
+    best_gain = (1.0 * nums[best]) / dens[best]
+    tied = [k for k in range(m)
+      if (best_gain - (1.0 * nums[k]) / dens[k]) * scale <= _TIE_TOL]
+    if len(tied) > 1:
+      if self.probe is not None: self.probe.count('tie_rescores')
+      cus = [self.proposed_cu(item, k, w) for k in tied]
+      best = tied[cus.index(max(cus))]
+    return best
+
+def lookup_counts(keys, cts, q):
+  # counts at keys q from sorted (keys, cts), 0 where absent
+  if len(keys) == 0:
+    return np.zeros(np.shape(q), dtype=np.int64)
+  j = np.minimum(np.searchsorted(keys, q), len(keys) - 1)
+  return np.where(keys[j] == q, cts[j], 0)
+
+def overlaps(X, att, m):
+  # (rows, m): per row and cluster, the summed counts of the row's
+  # values, from per att sorted (keys, cts), key = v*m + k
+  # dense lookup tables only for atts below SPARSE_MIN values,
+  # binary search in the keys for the rest; codes never counted
+  # (or out of range) add 0
+  ov = np.zeros((X.shape[0], m))
+  for i in range(X.shape[1]):
+    keys, cts = att[i]
+    col = np.asarray(X[:, i], dtype=np.int64)
+    card = int(keys[-1]) // m + 1 if len(keys) else 0
+    if card < SPARSE_MIN:
+      T = np.zeros((card + 1, m))  # last row: codes not counted
+      T[keys // m, keys % m] = cts
+      ov += T[np.where((col >= 0) & (col < card), col, card)]
+    else:
+      ov += lookup_counts(keys, cts, col[:, None] * m + np.arange(m))
+  return ov
+
+def best_clusters(X, att, sizes, k_sum_sq, old=None):
+  # vectorized CUEngine.best_cluster() of each row of X against
+  # fixed counts, in float arithmetic: att as for overlaps(), sizes
+  # and k_sum_sq per cluster; with old labels each row is first
+  # taken out of its own cluster and only moves for a strictly
+  # larger gain
+  r, d = X.shape
+  m = len(sizes)
+  ov = overlaps(X, att, m)
+  nk = np.tile(np.asarray(sizes, dtype=np.float64), (r, 1))
+  sk = np.tile(np.asarray(k_sum_sq, dtype=np.float64), (r, 1))
+  if old is not None:
+    rows = np.arange(r)
+    ov[rows, old] -= d
+    nk[rows, old] -= 1
+    sk[rows, old] -= 2 * ov[rows, old] + d
+  safe = np.maximum(nk, 1.0)
+  gain = (sk + 2 * ov + d) / (nk + 1) - np.where(nk > 0, sk / safe, 0.0)
+  best = np.argmax(gain, axis=1)
+  if old is not None:
+    rows = np.arange(r)
+    stay = gain[rows, best] <= gain[rows, old]
+    best[stay] = old[stay]
+  return best
+
+def cluster(ds, m, max_iter=0, weights=None, probe=None):
   # ds is encoded
-  # greedy algorithm
+  # greedy algorithm, then up to max_iter refinement passes
+  # weights[i] counts item i that many times (default 1 each)
+  # probe (a Probe) times the 'score', 'update' and 'refine'
+  # phases and gets every greedy step; if its callback stops the
+  # run, only the labels of the items placed so far are returned
   n = len(ds)  # number items to cluster
+  d = len(ds[0])  # number attributes/dimensions
+  if weights is None:
+    weights = [1] * n
 
   # assumes first m items are 'different'
   # because they seed the first m clusters
-  working_set = [0] * m
+  eng = CUEngine(m, d)
+  eng.probe = probe
   for k in range(m):
-    working_set[k] = list(ds[k]) 
-    
+    eng.add(ds[k], k, weights[k])
+
   clustering = list(range(m))  # [0,1,2, .. m-1]
 
   for i in range(m, n):
-    item_to_cluster = ds[i]
-    working_set.append(item_to_cluster)  # working set changed
+    if probe is not None: t = time.perf_counter()
 
-    proposed_clusterings = []  # empty list
-    for k in range(m):         # proposed new clusterings
-      copy_of_clustering = list(clustering) 
-      copy_of_clustering.append(k)
-      proposed_clusterings.append(copy_of_clustering) 
+    # which cluster gives best CU? (greedy)
+    # scored from the running counts, not by re-running
+    # cat_utility() on m proposed clusterings
+    best_proposed = eng.best_cluster(ds[i], weights[i])  # 0, 1, . . m-1
+    if probe is not None: t = probe.tick('score', t)
 
-    proposed_cus = [0.0] * m   # compute CU of each proposed
-    for k in range(m):
-      proposed_cus[k] = \
-        cat_utility(working_set, proposed_clusterings[k], m)
-
-    # which proposed clustering will give best CU? (greedy)
-    best_proposed = np.argmax(proposed_cus)  # 0, 1, . . m-1
-
-    # update clustering
+    # update counts and clustering
+    eng.add(ds[i], best_proposed, weights[i])
     clustering.append(best_proposed)
 
+    if probe is not None:
+      probe.tick('update', t)
+      probe.count('steps')
+      if probe.step(i, best_proposed, eng):
+        break
+
+  if max_iter > 0 and not (probe is not None and probe.stopped):
+    refine(ds, clustering, m, max_iter, eng, weights, probe)
+  if probe is not None:
+    probe.counts['engine_cells'] = eng.n_cells()
   return clustering
 
+def refine(ds, clustering, m, max_iter=10, eng=None, weights=None,
+  probe=None):
+  # move items to the cluster that most improves CU, pass after
+  # pass, until nothing moves or max_iter passes are done
+  # clustering is updated in place; returns number of passes
+  # probe (a Probe) times the 'refine' phase, counts passes/moves
+  if probe is not None: t = time.perf_counter()
+  if weights is None:
+    weights = [1] * len(ds)
+  if eng is None:
+    eng = CUEngine.from_clustering(ds, clustering, m, weights)
+  passes = 0
+  for it in range(max_iter):
+    passes += 1
+    moved = 0
+    for i in range(len(ds)):
+      item = ds[i]
+      w = weights[i]
+      k = clustering[i]
+      if eng.cluster_cts[k] == w: continue  # never empty a cluster
+      eng.remove(item, k, w)
+      best = eng.best_cluster(item, w)
+      if best != k:
+        # move only on a strict gain, so ties don't oscillate
+        num_b, den_b = eng.gain(item, best, w)
+        num_k, den_k = eng.gain(item, k, w)
+        if num_b * den_k <= num_k * den_b:
+          best = k
+      eng.add(item, best, w)
+      if best != k:
+        clustering[i] = best
+        moved += 1
+    if probe is not None:
+      probe.count('passes')
+      probe.count('moves', moved)
+    if moved == 0:
+      break
+  if probe is not None: probe.tick('refine', t)
+  return passes
+
+def collapse_rows(ds):
+  # identical encoded rows -> (unique rows, counts, inverse)
+  # unique rows keep first-occurrence order, so the first m
+  # distinct rows still seed cluster(); ds[i] == uniq[inverse[i]]
+  X = np.asarray(ds)
+  _, first, inverse, counts = np.unique(X, axis=0, return_index=True,
+    return_inverse=True, return_counts=True)
+  order = np.argsort(first)  # sorted-unique -> first-seen order
+  rank = np.empty_like(order)
+  rank[order] = np.arange(len(order))
+  uniq = X[first[order]].tolist()
+  return uniq, counts[order].tolist(), rank[inverse.ravel()].tolist()
+
+def expand_labels(labels, inverse):
+  # labels of unique rows back onto the original rows
+  return [labels[j] for j in inverse]
+
+def cluster_unique(ds, m, max_iter=0):
+  # cluster() over the distinct rows of ds only, each weighted by
+  # how often it occurs; returns labels for every row of ds
+  uniq, counts, inverse = collapse_rows(ds)
+  labels = cluster(uniq, m, max_iter, counts)
+  return expand_labels(labels, inverse)
+
+def _restart(ds, m, max_iter, seed):
+  # one restart: greedy pass over a shuffled row order (given
+  # order when seed is None), refined, labels back in ds order
+  n = len(ds)
+  if seed is None:
+    order = list(range(n))
+  else:
+    order = list(np.random.RandomState(seed).permutation(n))
+  shuffled = [ds[i] for i in order]
+  labels = cluster(shuffled, m, max_iter)
+  clustering = [0] * n
+  for j in range(n):
+    clustering[order[j]] = labels[j]
+  cu = CUEngine.from_clustering(ds, clustering, m).cu()
+  return clustering, cu
+
+def cluster_restarts(ds, m, n_restarts=8, max_iter=10, seed=0,
+  n_jobs=None):
+  # run n_restarts refined clusterings in parallel on a process
+  # pool and keep the best CU; restart 0 uses the given row
+  # order, restart r > 0 shuffles rows with seed + r
+  # n_jobs=1 runs in this process; returns (clustering, cu)
+  seeds = [None] + [seed + r for r in range(1, n_restarts)]
+  args = [(ds, m, max_iter, s) for s in seeds]
+  if n_jobs == 1:
+    results = [_restart(*a) for a in args]
+  else:
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+      results = list(pool.map(_restart, *zip(*args)))
+
+  best = 0
+  for r in range(len(results)):
+    if results[r][1] > results[best][1]:
+      best = r
+  return results[best]
+
 # =======================================
 
 def main():
@@ -133,12 +664,8 @@ def main():
               ['true','4','2','107.5.15.1','pt-BR','true','Windows 10','true','America/Sao_Paulo','false','Edge','80.0.4170','amd radeon rx 560','1gd7abb2e497c9f5a00ff94da5dc9e2'],
               ['true','2','6','251.203.64.179','pt-BR','false','Windows 8','true','America/Sao_Paulo','false','Firefox','80.0.4170','amd radeon rx 560','1gd7abb2e497c9f5a00ff94da5dc9e2']]
   
-  # in non-demo scenario, programmtically encode
-  enc_data = [[1,2,0,0,0,1,1,0,0,0,0,0,0,0],
-              [1,1,1,1,0,1,0,0,0,0,1,1,1,1],
-              [1,2,0,2,0,1,1,0,0,0,0,0,0,2],
-              [0,1,0,3,0,1,1,0,0,0,2,1,1,3],
-              [0,0,2,4,0,0,0,0,0,0,1,1,1,4]]
+  # learn one vocabulary per column and encode programmatically
+  enc_data = CatEncoder(FEATURES).encode_rows(raw_data).tolist()
 
   print("\nRaw data: ")
   for item in raw_data:
@@ -158,7 +685,9 @@ def main():
   print(clustering) 
 
   cu = cat_utility(enc_data, clustering, m)
-  print("Category utility of clustering = %0.4f \n" % cu)
+  print("Category utility of clustering = %0.4f" % cu)
+  print("Vectorized category utility = %0.4f \n" %
+    cat_utility_np(enc_data, clustering, m))
 
   print("\nClustered raw data: ")
   print("=====")
@@ -0,0 +1,146 @@
+# cat_encoder.py
+# programmatic categorical encoding for the fingerprint tables
+# learns one vocabulary per column (first-seen order, like
+# pd.factorize), emits compact integer codes and persists the
+# vocabularies so later batches encode identically
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# attributes clustered by cat_cluster, in dados100-final.csv order
+FEATURES = ['cookies_enabled', 'device_memory', 'hardware_concurrency',
+  'ip', 'languages', 'local_storage', 'platform', 'session_storage',
+  'timezone', 'touch_support', 'browser', 'browser_version', 'gpu',
+  'hash']
+
+UNSEEN = 0  # reserved code for values not in the vocabulary
+CACHE_DIR = '.cat_cache'  # default home of encoded dataset caches
+
+def code_dtype(n_codes):
+  # smallest signed int type that holds codes 0 .. n_codes-1
+  for dt in (np.int8, np.int16, np.int32):
+    if n_codes - 1 <= np.iinfo(dt).max:
+      return dt
+  return np.int64
+
+class CatEncoder(object):
+  # per-column vocabularies: vocab[i] lists the values of column i,
+  # value vocab[i][j] is encoded j+1 (code 0 is UNSEEN)
+
+  def __init__(self, columns=FEATURES):
+    self.columns = list(columns)
+    self.vocab = [[] for c in self.columns]
+    self._index = [{} for c in self.columns]  # value -> code
+
+  def cardinality(self, i):
+    # number of codes used by column i, UNSEEN included
+    return len(self.vocab[i]) + 1
+
+  def dtype(self, i):
+    return code_dtype(self.cardinality(i))
+
+  def _encode_col(self, i, values, learn):
+    # values is a Series of str; returns int64 codes
+    index = self._index[i]
+    if learn:
+      for v in pd.unique(values):
+        if v not in index:
+          self.vocab[i].append(v)
+          index[v] = len(self.vocab[i])
+    codes = values.map(index).fillna(UNSEEN)
+    return codes.to_numpy(dtype=np.int64)
+
+  def encode_frame(self, df, learn=True):
+    # one int64 code array per column; with learn=False unseen
+    # values map to UNSEEN and the vocabularies stay fixed
+    return [self._encode_col(i, df[c].astype(str), learn)
+      for i, c in enumerate(self.columns)]
+
+  def compact(self, cols):
+    # cast each column's codes to its cardinality-sized dtype
+    return [cols[i].astype(self.dtype(i)) for i in range(len(cols))]
+
+  def matrix(self, cols):
+    # stack code columns into an (n, d) array, narrowest dtype
+    # that holds every column
+    dt = code_dtype(max([self.cardinality(i)
+      for i in range(len(self.columns))]))
+    return np.column_stack(cols).astype(dt)
+
+  def encode_rows(self, rows, learn=True):
+    # rows is a list of lists of raw values, in column order
+    df = pd.DataFrame(rows, columns=self.columns)
+    return self.matrix(self.encode_frame(df, learn))
+
+  def encode_csv(self, path, delimiter=';', chunksize=100000,
+    learn=True):
+    # encode a dados100-final.csv-style file in one chunked pass,
+    # learning the vocabularies on the way unless learn=False
+    # returns compact per-column code arrays
+    parts = [[] for c in self.columns]
+    reader = pd.read_csv(path, delimiter=delimiter, dtype=str,
+      keep_default_na=False, usecols=self.columns, chunksize=chunksize)
+    for chunk in reader:
+      cols = self.encode_frame(chunk, learn)
+      for i in range(len(cols)):
+        parts[i].append(cols[i])
+    return self.compact([np.concatenate(p) if p else
+      np.zeros(0, dtype=np.int64) for p in parts])
+
+  def decode(self, i, codes):
+    # raw values for column i codes, None for UNSEEN
+    vocab = self.vocab[i]
+    return [vocab[c - 1] if c != UNSEEN else None for c in codes]
+
+  def save(self, path):
+    with open(path, 'w') as f:
+      json.dump({'columns': self.columns, 'vocab': self.vocab}, f)
+
+  @classmethod
+  def load(cls, path):
+    with open(path) as f:
+      state = json.load(f)
+    enc = cls(state['columns'])
+    for i in range(len(enc.columns)):
+      enc.vocab[i] = list(state['vocab'][i])
+      enc._index[i] = dict((v, j + 1) for j, v in enumerate(enc.vocab[i]))
+    return enc
+
+def file_digest(path, block=1 << 20):
+  # sha256 of the file's content
+  h = hashlib.sha256()
+  with open(path, 'rb') as f:
+    for buf in iter(lambda: f.read(block), b''):
+      h.update(buf)
+  return h.hexdigest()
+
+def cached_codes(path, columns=FEATURES, delimiter=';',
+  cache_dir=CACHE_DIR):
+  # encoded (n, d) matrix of a csv plus its encoder, cached on disk
+  # as <cache_dir>/<key>/codes.npy + vocab.json, key = hash of the
+  # file content and encoding options; the matrix is opened with
+  # mmap_mode='r', so repeat runs and parallel workers share one
+  # read-only page-cache buffer instead of re-parsing the text
+  key = hashlib.sha256(json.dumps([file_digest(path), list(columns),
+    delimiter]).encode('utf-8')).hexdigest()[:32]
+  home = os.path.join(cache_dir, key)
+  codes_path = os.path.join(home, 'codes.npy')
+  vocab_path = os.path.join(home, 'vocab.json')
+  if not (os.path.exists(codes_path) and os.path.exists(vocab_path)):
+    enc = CatEncoder(columns)
+    X = enc.matrix(enc.encode_csv(path, delimiter))
+    os.makedirs(home, exist_ok=True)
+    # write under temp names then rename, so a concurrent reader
+    # never opens a half-written file
+    tmp = '%s.%d' % (codes_path, os.getpid())
+    with open(tmp, 'wb') as f:
+      np.save(f, X)
+    os.replace(tmp, codes_path)
+    tmp = '%s.%d' % (vocab_path, os.getpid())
+    enc.save(tmp)
+    os.replace(tmp, vocab_path)
+  return np.load(codes_path, mmap_mode='r'), CatEncoder.load(vocab_path)
@@ -0,0 +1,62 @@
+# cat_kmeans.py
+# k-means with every point-centroid distance computed in one
+# broadcast, replacing the iterrows() loop in the notebooks
+
+import numpy as np
+import pandas as pd
+
+def _features(X, columns):
+  # float (n, d) array of the chosen columns of a DataFrame or array
+  if isinstance(X, pd.DataFrame):
+    X = X if columns is None else X[list(columns)]
+    return X.to_numpy(dtype=np.float64)
+  X = np.asarray(X, dtype=np.float64)
+  return X if columns is None else X[:, list(columns)]
+
+def sq_distances(X, centroids):
+  # (n, k) squared Euclidean distances, |x|^2 - 2 x.c + |c|^2
+  d2 = np.sum(X * X, axis=1)[:, None] - 2.0 * X.dot(centroids.T) + \
+    np.sum(centroids * centroids, axis=1)[None, :]
+  return np.maximum(d2, 0.0)  # rounding can dip just below 0
+
+def predict(X, centroids, columns=None):
+  # index of the nearest centroid for each row
+  return np.argmin(sq_distances(_features(X, columns),
+    np.asarray(centroids, dtype=np.float64)), axis=1)
+
+def kmeans(X, k, columns=None, centroids=None, tol=1e-4, max_iter=300,
+  seed=None):
+  # Lloyd's k-means on the given feature columns (all by default)
+  # of a DataFrame or (n, d) array
+  # starts from centroids, or k random rows like X.sample(n=k),
+  # and stops once the centroids move less than tol (Frobenius
+  # norm of the shift) or after max_iter iterations
+  # returns (labels, centroids, inertia, n_iter); labels are 0-based
+  X = _features(X, columns)
+  n = X.shape[0]
+  if centroids is None:
+    rows = np.random.RandomState(seed).choice(n, k, replace=False)
+    centroids = X[rows]
+  C = np.array(centroids, dtype=np.float64)
+
+  it = 0  # max_iter=0 just labels rows by the given centroids
+  for it in range(1, max_iter + 1):
+    labels = np.argmin(sq_distances(X, C), axis=1)
+
+    # new centroid = mean of its rows; an empty cluster keeps its old one
+    sizes = np.bincount(labels, minlength=k)
+    sums = np.zeros_like(C)
+    np.add.at(sums, labels, X)
+    new_C = C.copy()
+    filled = sizes > 0
+    new_C[filled] = sums[filled] / sizes[filled][:, None]
+
+    shift = np.linalg.norm(new_C - C)
+    C = new_C
+    if shift <= tol:
+      break
+
+  d2 = sq_distances(X, C)
+  labels = np.argmin(d2, axis=1)
+  inertia = float(d2[np.arange(n), labels].sum())
+  return labels, C, inertia, it
@@ -0,0 +1,129 @@
+# cat_kmodes.py
+# k-modes clustering of categorical fingerprints: Hamming mismatch
+# counts between rows and cluster modes, modes updated from
+# per-cluster value counts, density-based seeding
+# linear in n per iteration, unlike the greedy CU cluster()
+
+import numpy as np
+
+from cat_cluster import SPARSE_MIN, cat_utility_np
+from cat_encoder import code_dtype
+
+BLOCK = 1 << 16  # rows per distance block, keeps the counts in cache
+
+def _packed(X):
+  # one contiguous array per attribute, (codes, top code), in the
+  # narrowest type: uint8, one byte per row, for attributes with
+  # fewer than 255 codes (most of the schema), wider only for ip,
+  # hash and the like
+  X = np.asarray(X)
+  cols = []
+  for i in range(X.shape[1]):
+    top = int(X[:, i].max()) if len(X) else 0
+    dt = np.uint8 if top < 255 else code_dtype(top + 2)
+    cols.append((np.ascontiguousarray(X[:, i], dtype=dt), top))
+  return cols
+
+def _mismatches(cols, modes, block=BLOCK):
+  # (n, m) Hamming distances of packed rows to modes, one column
+  # against one mode code at a time; a mode code no row has
+  # mismatches every row
+  modes = np.asarray(modes, dtype=np.int64)
+  n = len(cols[0][0])
+  out = np.zeros((modes.shape[0], n), dtype=np.int32)
+  for s in range(0, n, block):
+    o = out[:, s:s + block]
+    for i in range(len(cols)):
+      c, top = cols[i]
+      b = c[s:s + block]
+      for k in range(modes.shape[0]):
+        v = modes[k, i]
+        if 0 <= v <= top:
+          o[k] += b != c.dtype.type(v)
+        else:
+          o[k] += 1
+  return out.T
+
+def mismatches(X, modes, block=BLOCK):
+  # (n, m) Hamming distances: attributes where row and mode differ
+  return _mismatches(_packed(X), modes, block)
+
+def _assign(parts, modes, block=BLOCK):
+  # nearest mode of each row and the total mismatch count
+  D = _mismatches(parts, modes, block)
+  labels = np.argmin(D, axis=1)
+  return labels, int(D[np.arange(D.shape[0]), labels].sum())
+
+def update_modes(X, labels, modes):
+  # most frequent value of each attribute in each cluster, smallest
+  # code on ties; empty clusters keep their mode
+  m, d = modes.shape
+  sizes = np.bincount(labels, minlength=m)
+  new = modes.copy()
+  filled = sizes > 0
+  for i in range(d):
+    col = X[:, i].astype(np.int64)
+    card = int(col.max()) + 1
+    keys = labels * card + col
+    if card < SPARSE_MIN:
+      cts = np.bincount(keys, minlength=m * card).reshape(m, card)
+      new[filled, i] = np.argmax(cts, axis=1)[filled]
+    else:
+      # non-zero (cluster, value) counts only; after sorting by
+      # cluster then count (desc) the first of each cluster wins
+      keys, cts = np.unique(keys, return_counts=True)
+      cl = keys // card
+      order = np.lexsort((-cts, cl))
+      first = order[np.r_[True, cl[order][1:] != cl[order][:-1]]]
+      new[cl[first], i] = keys[first] % card
+  return new
+
+def _density_seeds(X, parts, m, block):
+  n, d = X.shape
+  density = np.zeros(n)
+  for i in range(d):
+    col = X[:, i].astype(np.int64)
+    density += np.bincount(col)[col]
+  density /= n * d
+  seeds = [int(np.argmax(density))]
+  nearest = _mismatches(parts, X[seeds], block)[:, 0]
+  for k in range(1, m):
+    score = density * nearest
+    seeds.append(int(np.argmax(score)))
+    if score[seeds[-1]] == 0:
+      raise ValueError('%d distinct rows, fewer than m = %d' % (k, m))
+    nearest = np.minimum(nearest,
+      _mismatches(parts, X[seeds[-1:]], block)[:, 0])
+  return X[seeds].copy()
+
+def density_seeds(X, m, block=BLOCK):
+  # Cao et al. seeding: the first mode is the densest row (its
+  # values are the most frequent on average), each next one the
+  # row maximizing density * distance to the nearest chosen mode
+  # rows equal to a chosen mode score 0, so fewer than m distinct
+  # rows is an error rather than a repeated mode
+  X = np.asarray(X)
+  return _density_seeds(X, _packed(X), m, block)
+
+def kmodes(X, m, modes=None, max_iter=100, block=BLOCK):
+  # k-modes on an (n, d) code matrix
+  # starts from modes, or density_seeds(), and stops when no row
+  # changes cluster or after max_iter iterations
+  # returns (labels, modes, cost, cu, n_iter): cost is the total
+  # mismatch count, cu the category utility of the labels
+  X = np.asarray(X)
+  parts = _packed(X)
+  if modes is None:
+    modes = _density_seeds(X, parts, m, block)
+  modes = np.asarray(modes, dtype=np.int64)
+
+  labels, cost = _assign(parts, modes, block)
+  it = 0  # max_iter=0 just labels rows by the given modes
+  for it in range(1, max_iter + 1):
+    modes = update_modes(X, labels, modes)
+    new, cost = _assign(parts, modes, block)
+    if np.array_equal(new, labels):
+      break
+    labels = new
+
+  return labels, modes, cost, cat_utility_np(X, labels, m), it
@@ -0,0 +1,82 @@
+# cat_online.py
+# persistent CU cluster model for new fingerprints: assign a
+# mini-batch of encoded rows to their best clusters and fold them
+# into the per-cluster value counts, no refit over history
+
+import pickle
+from collections import deque
+
+import numpy as np
+
+from cat_cluster import CUEngine, cluster
+
+def _rows(X):
+  # plain int lists; numpy int8 codes would overflow in the counts
+  return np.asarray(X).tolist()
+
+class CUModel(object):
+  # the per-cluster value counts of a clustering (a CUEngine),
+  # plus the encoder that produced the codes, if any
+  # with window set only the most recent window rows are counted,
+  # older ones age out as new ones are folded in
+
+  def __init__(self, m, d, encoder=None, window=None):
+    self.eng = CUEngine(m, d)
+    self.encoder = encoder
+    self.window = window
+    self._recent = deque()  # (item, cluster) still in the window
+
+  @classmethod
+  def fit(cls, ds, m, max_iter=0, encoder=None, window=None):
+    # model of cluster(ds, m, max_iter); returns (model, labels)
+    ds = _rows(ds)
+    labels = cluster(ds, m, max_iter)
+    model = cls(m, len(ds[0]), encoder, window)
+    for i in range(len(ds)):
+      model._fold(ds[i], labels[i])
+    return model, labels
+
+  def _fold(self, item, k):
+    self.eng.add(item, k)
+    if self.window is not None:
+      self._recent.append((item, k))
+      while len(self._recent) > self.window:
+        old, ok = self._recent.popleft()
+        self.eng.remove(old, ok)
+
+  def predict(self, X):
+    # best cluster for each row, counts left unchanged
+    # O(rows * m * d)
+    return [self.eng.best_cluster(item) for item in _rows(X)]
+
+  def partial_fit(self, X):
+    # place each row in its best cluster and fold it into the
+    # counts, in order, like further steps of cluster()
+    # O(rows * m * d); returns the labels
+    labels = []
+    cts = self.eng.cluster_cts
+    for item in _rows(X):
+      if 0 in cts:  # a cluster emptied by the window, reseed it
+        k = cts.index(0)
+      else:
+        k = self.eng.best_cluster(item)
+      self._fold(item, k)
+      labels.append(k)
+    return labels
+
+  def encode(self, rows, learn=False):
+    # raw rows to codes with the model's encoder; with learn=False
+    # new values map to UNSEEN
+    return self.encoder.encode_rows(rows, learn)
+
+  def cu(self):
+    return self.eng.cu()
+
+  def save(self, path):
+    with open(path, 'wb') as f:
+      pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+
+  @staticmethod
+  def load(path):
+    with open(path, 'rb') as f:
+      return pickle.load(f)
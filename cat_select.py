@@ -0,0 +1,96 @@
+# cat_select.py
+# choose the number of clusters m: fit CU clustering (and
+# optionally KMeans) for a range of m concurrently on a process
+# pool, all workers reading one shared encoded matrix
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cat_cluster import CUEngine, cluster, cluster_unique
+
+def _open(source):
+  # workers get a .npy path (opened read-only, memory-mapped, so
+  # every process shares the same pages) or the array itself
+  if isinstance(source, str):
+    return np.load(source, mmap_mode='r')
+  return source
+
+class _Rows(object):
+  # read-only row sequence over a code matrix for cluster(): each
+  # row becomes a list of ints only when accessed, so a worker never
+  # holds more than the shared int matrix plus one row
+
+  def __init__(self, X):
+    self.X = X
+
+  def __len__(self):
+    return self.X.shape[0]
+
+  def __getitem__(self, i):
+    return self.X[i].tolist()
+
+def _npy_path(X):
+  # path of the .npy file X maps, only if X is the whole file:
+  # a slice or column view of a memmap keeps its parent's filename,
+  # and a raw np.memmap may not be a .npy file at all
+  if not isinstance(X, np.memmap) or X.filename is None or \
+    isinstance(X.base, np.ndarray) or not X.filename.endswith('.npy'):
+    return None
+  try:
+    F = np.load(X.filename, mmap_mode='r')
+  except (OSError, ValueError):
+    return None
+  if F.shape != X.shape or F.dtype != X.dtype or F.offset != X.offset or \
+    F.strides != X.strides:
+    return None
+  return X.filename
+
+def _fit_m(source, m, max_iter, dedup, kmeans, seed):
+  # scores for one m; returns a dict, one row of the sweep table
+  X = _open(source)
+  ds = _Rows(X)
+  row = {'m': m}
+
+  start = time.perf_counter()
+  if dedup:
+    labels = cluster_unique(X, m, max_iter)  # lists distinct rows only
+  else:
+    labels = cluster(ds, m, max_iter)
+  row['cu'] = CUEngine.from_clustering(ds, labels, m).cu()
+  row['seconds'] = time.perf_counter() - start
+  row['sizes'] = np.bincount(labels, minlength=m).tolist()
+
+  if kmeans:
+    from sklearn.cluster import KMeans  # optional, only for kmeans=True
+    start = time.perf_counter()
+    km = KMeans(n_clusters=m, init='random', n_init=10,
+      random_state=seed).fit(np.asarray(X, dtype=np.float64))
+    row['inertia'] = km.inertia_
+    row['kmeans_seconds'] = time.perf_counter() - start
+    row['kmeans_sizes'] = np.bincount(km.labels_, minlength=m).tolist()
+  return row
+
+def sweep(X, ms=range(2, 11), max_iter=0, dedup=False, kmeans=False,
+  seed=0, n_jobs=None):
+  # one row per m: CU of cluster(), its runtime and cluster sizes,
+  # plus KMeans inertia, runtime and sizes when kmeans=True
+  # X is an (n, d) code matrix; pass the memmap returned by
+  # cat_encoder.cached_codes() (or a .npy path) so workers map the
+  # file instead of each receiving a pickled copy; slices and other
+  # views of the memmap are pickled, since they don't cover the file
+  # workers turn one row at a time into Python ints; dedup=True
+  # also holds the distinct rows, kmeans=True a float copy of X
+  # n_jobs=1 runs in this process
+  source = _npy_path(X)
+  if source is None:
+    source = X
+  args = [(source, m, max_iter, dedup, kmeans, seed) for m in ms]
+  if n_jobs == 1:
+    rows = [_fit_m(*a) for a in args]
+  else:
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+      rows = list(pool.map(_fit_m, *zip(*args)))
+  return pd.DataFrame(rows).set_index('m')
@@ -0,0 +1,254 @@
+# cat_service.py
+# local asyncio HTTP service that scores fingerprints against a
+# fixed CU (cat_online.CUModel) or k-means (centroids .npy) model
+# concurrent requests are micro-batched into one vectorized call
+#
+#   python cat_service.py model.pkl --port 8080
+#   POST /score  {"rows": [[raw values, FEATURES order], ...]}
+#                or {"codes": [[encoded values], ...]}
+#             -> {"labels": [...]}
+#   GET  /stats  -> request/row/batch counters, p50/p99 latency, rows/s
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from cat_cluster import best_clusters
+from cat_kmeans import sq_distances
+from cat_online import CUModel
+
+class CUScorer(object):
+  # best cluster per row from the value-in-cluster counts of a
+  # CUModel, taken once as sorted (keys, cts) per att: dense tables
+  # only for low-cardinality atts, so ip/hash cost O(non-zeros)
+  # same choice as CUEngine.best_cluster(), in float arithmetic;
+  # unknown codes count 0
+
+  def __init__(self, model):
+    eng = model.eng
+    self.encoder = model.encoder
+    self.m = eng.m
+    self.d = eng.d
+    self.cells = eng.cells()
+    self.sizes = np.array(eng.cluster_cts, dtype=np.float64)
+    self.sums = np.array(eng.k_sum_sq, dtype=np.float64)
+
+  def score(self, X):
+    X = np.asarray(X, dtype=np.int64)
+    return best_clusters(X, self.cells, self.sizes, self.sums)
+
+class KMeansScorer(object):
+  # nearest centroid per row
+
+  def __init__(self, centroids, encoder=None):
+    self.centroids = np.asarray(centroids, dtype=np.float64)
+    self.d = self.centroids.shape[1]
+    self.encoder = encoder
+
+  def score(self, X):
+    X = np.asarray(X, dtype=np.float64)
+    return np.argmin(sq_distances(X, self.centroids), axis=1)
+
+class Stats(object):
+  # counters plus a window of recent request latencies
+
+  def __init__(self, keep=10000):
+    self.start = time.perf_counter()
+    self.requests = 0
+    self.rows = 0
+    self.batches = 0
+    self.latencies = deque(maxlen=keep)  # seconds
+
+  def report(self):
+    elapsed = time.perf_counter() - self.start
+    lat = np.array(self.latencies) * 1000.0
+    return {
+      'requests': self.requests,
+      'rows': self.rows,
+      'batches': self.batches,
+      'rows_per_batch': self.rows / self.batches if self.batches else 0.0,
+      'p50_ms': float(np.percentile(lat, 50)) if len(lat) else None,
+      'p99_ms': float(np.percentile(lat, 99)) if len(lat) else None,
+      'requests_per_s': self.requests / elapsed,
+      'rows_per_s': self.rows / elapsed,
+    }
+
+class Batcher(object):
+  # collects concurrent score() calls for max_wait seconds (up to
+  # max_rows rows), then encodes all their raw rows with one
+  # encode_rows() call and scores everything with one score() call
+
+  def __init__(self, scorer, stats, max_rows=4096, max_wait=0.001):
+    self.scorer = scorer
+    self.stats = stats
+    self.max_rows = max_rows
+    self.max_wait = max_wait
+    self.queue = asyncio.Queue()
+
+  async def score(self, rows, raw):
+    # rows: list of raw value lists (raw=True) or a code matrix
+    fut = asyncio.get_running_loop().create_future()
+    self.queue.put_nowait((rows, raw, fut))
+    return await fut
+
+  def _codes(self, pending):
+    raw = [r for rows, is_raw, f in pending if is_raw for r in rows]
+    R = self.scorer.encoder.encode_rows(raw, learn=False) if raw else None
+    parts = []
+    j = 0
+    for rows, is_raw, f in pending:
+      if is_raw:
+        parts.append(R[j:j + len(rows)])
+        j += len(rows)
+      else:
+        parts.append(rows)
+    return np.concatenate(parts)
+
+  async def run(self):
+    while True:
+      pending = [await self.queue.get()]
+      await asyncio.sleep(self.max_wait)  # let concurrent requests queue up
+      n_rows = len(pending[0][0])
+      while n_rows < self.max_rows and not self.queue.empty():
+        item = self.queue.get_nowait()
+        pending.append(item)
+        n_rows += len(item[0])
+
+      try:
+        labels = self.scorer.score(self._codes(pending))
+      except Exception as e:
+        for rows, is_raw, fut in pending:
+          if not fut.done():  # its handler may have been cancelled
+            fut.set_exception(e)
+        continue
+      self.stats.batches += 1
+      j = 0
+      for rows, is_raw, fut in pending:
+        if not fut.done():
+          fut.set_result(labels[j:j + len(rows)].tolist())
+        j += len(rows)
+
+class ScoringService(object):
+  # minimal HTTP/1.1 (keep-alive) server around a Batcher
+
+  def __init__(self, scorer, max_rows=4096, max_wait=0.001):
+    self.scorer = scorer
+    self.stats = Stats()
+    self.batcher = Batcher(scorer, self.stats, max_rows, max_wait)
+
+  def _rows(self, req):
+    # (rows, raw) of a request, checked so one bad request can't
+    # fail the whole batch it would be scored in
+    d = self.scorer.d
+    if 'codes' in req:
+      X = np.asarray(req['codes'], dtype=np.int64)
+      if X.ndim != 2 or X.shape[1] != d or X.shape[0] == 0:
+        raise ValueError('expected rows of %d codes' % d)
+      return X, False
+    rows = req['rows']
+    if self.scorer.encoder is None:
+      raise ValueError('model has no encoder, send codes')
+    if not isinstance(rows, list) or not rows or \
+      not all(isinstance(r, list) and len(r) == d for r in rows):
+      raise ValueError('expected rows of %d values' % d)
+    return rows, True
+
+  async def _handle(self, method, path, body):
+    if method == 'GET' and path == '/stats':
+      return 200, self.stats.report()
+    if method == 'POST' and path == '/score':
+      start = time.perf_counter()
+      try:
+        rows, raw = self._rows(json.loads(body.decode('utf-8')))
+      except (ValueError, KeyError, TypeError) as e:
+        return 400, {'error': str(e)}
+      try:
+        labels = await self.batcher.score(rows, raw)
+      except Exception as e:  # the whole batch failed
+        return 500, {'error': str(e)}
+      self.stats.requests += 1
+      self.stats.rows += len(labels)
+      self.stats.latencies.append(time.perf_counter() - start)
+      return 200, {'labels': labels}
+    return 404, {'error': 'not found'}
+
+  async def _serve(self, reader, writer):
+    try:
+      while True:
+        line = await reader.readline()
+        if not line:
+          break
+        method, path, version = line.decode('latin-1').split()
+        length = 0
+        keep_alive = version == 'HTTP/1.1'
+        while True:
+          h = await reader.readline()
+          if h in (b'\r\n', b'\n', b''):
+            break
+          name, _, value = h.decode('latin-1').partition(':')
+          name = name.strip().lower()
+          if name == 'content-length':
+            length = int(value)
+          elif name == 'connection':
+            keep_alive = value.strip().lower() == 'keep-alive'
+        body = await reader.readexactly(length) if length else b''
+
+        status, payload = await self._handle(method, path, body)
+        data = json.dumps(payload).encode('utf-8')
+        writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n'
+          'Content-Length: %d\r\nConnection: %s\r\n\r\n' % (status,
+          {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+          500: 'Internal Server Error'}[status],
+          len(data), 'keep-alive' if keep_alive else 'close')
+          ).encode('latin-1') + data)
+        await writer.drain()
+        if not keep_alive:
+          break
+    except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+      pass
+    finally:
+      writer.close()
+
+  async def serve(self, host='127.0.0.1', port=8080):
+    batcher = asyncio.ensure_future(self.batcher.run())
+    server = await asyncio.start_server(self._serve, host, port)
+    try:
+      async with server:
+        await server.serve_forever()
+    finally:
+      batcher.cancel()
+
+def load_scorer(path, encoder_path=None):
+  # .npy -> k-means centroids, anything else -> pickled CUModel
+  encoder = None
+  if encoder_path is not None:
+    from cat_encoder import CatEncoder
+    encoder = CatEncoder.load(encoder_path)
+  if path.endswith('.npy'):
+    return KMeansScorer(np.load(path), encoder)
+  scorer = CUScorer(CUModel.load(path))
+  if encoder is not None:
+    scorer.encoder = encoder
+  return scorer
+
+def main():
+  p = argparse.ArgumentParser(description='fingerprint scoring service')
+  p.add_argument('model', help='CUModel pickle or k-means centroids .npy')
+  p.add_argument('--vocab', help='CatEncoder vocabulary json for raw rows')
+  p.add_argument('--host', default='127.0.0.1')
+  p.add_argument('--port', type=int, default=8080)
+  p.add_argument('--max-rows', type=int, default=4096)
+  p.add_argument('--max-wait-ms', type=float, default=1.0)
+  args = p.parse_args()
+
+  service = ScoringService(load_scorer(args.model, args.vocab),
+    args.max_rows, args.max_wait_ms / 1000.0)
+  print("Scoring on http://%s:%d " % (args.host, args.port))
+  asyncio.run(service.serve(args.host, args.port))
+
+if __name__ == "__main__":
+  main()
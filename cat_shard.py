@@ -0,0 +1,229 @@
+# cat_shard.py
+# out-of-core CU clustering: the encoded data lives in .npy shards,
+# each shard's counts are computed on a process pool and merged by
+# summation, and rows are reassigned against the merged totals
+# labels are kept on disk next to each shard (<shard>.labels.npy),
+# the merged totals as sparse (keys, counts) .npy files that the
+# workers memory-map
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cat_cluster import SPARSE_MIN, best_clusters, cluster, \
+  lookup_counts
+from cat_encoder import FEATURES, CatEncoder, code_dtype
+
+def shard_csv(path, out_dir, columns=FEATURES, delimiter=';',
+  rows_per_shard=1000000):
+  # encode a csv into out_dir/shard-00000.npy, ... one chunk at a
+  # time, vocabularies in out_dir/vocab.json; returns shard paths
+  os.makedirs(out_dir, exist_ok=True)
+  enc = CatEncoder(columns)
+  paths = []
+  reader = pd.read_csv(path, delimiter=delimiter, dtype=str,
+    keep_default_na=False, usecols=columns, chunksize=rows_per_shard)
+  for chunk in reader:
+    p = os.path.join(out_dir, 'shard-%05d.npy' % len(paths))
+    np.save(p, enc.matrix(enc.encode_frame(chunk)))
+    paths.append(p)
+  enc.save(os.path.join(out_dir, 'vocab.json'))
+  return paths
+
+def _labels_path(path):
+  return path[:-len('.npy')] + '.labels.npy'
+
+def shard_labels(paths):
+  # labels of every shard, concatenated (small data / checks only)
+  return np.concatenate([np.load(_labels_path(p)) for p in paths])
+
+def _counts(X, labels, m):
+  # partial counts of one shard: cluster sizes, and per att the
+  # non-zero value-in-cluster counts as (keys, cts), key = v*m + k
+  sizes = np.bincount(labels, minlength=m)
+  att = []
+  for i in range(X.shape[1]):
+    col = np.asarray(X[:, i], dtype=np.int64)
+    keys = col * m + labels
+    card = int(col.max()) + 1 if len(col) else 0
+    if card < SPARSE_MIN:
+      cts = np.bincount(keys, minlength=card * m)
+      nz = np.flatnonzero(cts)
+      att.append((nz, cts[nz]))
+    else:
+      att.append(np.unique(keys, return_counts=True))
+  return sizes, att
+
+def merge_counts(parts):
+  # reduce: sum partial counts of several shards
+  sizes = np.sum([s for s, att in parts], axis=0)
+  att = []
+  for i in range(len(parts[0][1])):
+    keys = np.concatenate([a[i][0] for s, a in parts])
+    cts = np.concatenate([a[i][1] for s, a in parts])
+    keys, inverse = np.unique(keys, return_inverse=True)
+    att.append((keys, np.bincount(inverse, cts).astype(np.int64)))
+  return sizes, att
+
+def _sums(counts, m):
+  # un_sum_sq and k_sum_sq, as in CUEngine, from merged counts
+  sizes, att = counts
+  un_sum_sq = 0
+  k_sum_sq = np.zeros(m, dtype=np.int64)
+  for keys, cts in att:
+    v_cts = np.bincount(keys // m, cts).astype(np.int64)
+    un_sum_sq += int(np.sum(v_cts * v_cts))
+    k_sum_sq += np.bincount(keys % m, cts * cts, minlength=m).astype(np.int64)
+  return un_sum_sq, k_sum_sq
+
+def _cu(sizes, un_sum_sq, k_sum_sq, m):
+  if np.any(sizes == 0):  # a cluster has no items
+    return 0.0
+  n = float(sizes.sum())
+  return float(np.sum(k_sum_sq / sizes) - un_sum_sq / n) / (m * n)
+
+def counts_cu(counts, m):
+  # category utility from merged counts
+  un_sum_sq, k_sum_sq = _sums(counts, m)
+  return _cu(counts[0], un_sum_sq, k_sum_sq, m)
+
+def _drop_zeros(counts):
+  # counts without cells summed down to 0
+  sizes, att = counts
+  return sizes, [(keys[cts != 0], cts[cts != 0]) for keys, cts in att]
+
+def _negated(counts):
+  sizes, att = counts
+  return -sizes, [(keys, -cts) for keys, cts in att]
+
+def _totals_paths(prefix, d):
+  return ([prefix + '-keys-%03d.npy' % i for i in range(d)],
+    [prefix + '-cts-%03d.npy' % i for i in range(d)])
+
+def _save_totals(counts, k_sum_sq, prefix):
+  # merged counts on disk for the workers: <prefix>.npz holds the
+  # cluster sizes and sums, each att's (keys, cts) its own .npy
+  sizes, att = counts
+  np.savez(prefix + '.npz', sizes=sizes, k_sum_sq=k_sum_sq)
+  keys_paths, cts_paths = _totals_paths(prefix, len(att))
+  for i in range(len(att)):
+    np.save(keys_paths[i], att[i][0])
+    np.save(cts_paths[i], att[i][1])
+
+def _load_totals(prefix, d):
+  # (sizes, k_sum_sq, att), the att counts memory-mapped
+  with np.load(prefix + '.npz') as f:
+    sizes, k_sum_sq = f['sizes'], f['k_sum_sq']
+  keys_paths, cts_paths = _totals_paths(prefix, d)
+  att = [(np.load(keys_paths[i], mmap_mode='r'),
+    np.load(cts_paths[i], mmap_mode='r')) for i in range(d)]
+  return sizes, k_sum_sq, att
+
+def _next_path(path):
+  return path[:-len('.npy')] + '.next.npy'
+
+def _propose_shard(path, prefix):
+  # map step: best labels of one shard against the totals on disk
+  # an unlabelled shard is labelled, returning its counts
+  # a labelled one saves its proposal to <shard>.next.npy and
+  # returns the count changes of its moved rows (None if none move)
+  X = np.load(path, mmap_mode='r')
+  sizes, k_sum_sq, att = _load_totals(prefix, X.shape[1])
+  m = len(sizes)
+  lpath = _labels_path(path)
+  old = np.load(lpath).astype(np.int64) if os.path.exists(lpath) else None
+  new = best_clusters(X, att, sizes, k_sum_sq, old)
+  if old is None:
+    np.save(lpath, new.astype(code_dtype(m)))
+    return _counts(X, new, m), len(new)
+  moved = new != old
+  if not moved.any():
+    return None, 0
+  np.save(_next_path(path), new.astype(code_dtype(m)))
+  Xm = np.asarray(X[moved])
+  delta = merge_counts([_counts(Xm, new[moved], m),
+    _negated(_counts(Xm, old[moved], m))])
+  return _drop_zeros(delta), int(moved.sum())
+
+def _shard_counts(path, m):
+  X = np.load(path, mmap_mode='r')
+  return _counts(X, np.load(_labels_path(path)).astype(np.int64), m)
+
+def _map(fn, args, n_jobs):
+  if n_jobs == 1:
+    return [fn(*a) for a in args]
+  with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+    return list(pool.map(fn, *zip(*args)))
+
+def shard_cu(paths, m, n_jobs=None):
+  # CU of the labels on disk, counted shard by shard
+  return counts_cu(merge_counts(_map(_shard_counts,
+    [(p, m) for p in paths], n_jobs)), m)
+
+def _moved_sum_sq(counts, pending, delta, m):
+  # change of k_sum_sq when delta is added to counts + pending
+  out = np.zeros(m, dtype=np.int64)
+  for i in range(len(delta[1])):
+    keys, dc = delta[1][i]
+    c = lookup_counts(*counts[1][i], keys)
+    if pending is not None:
+      c = c + lookup_counts(*pending[1][i], keys)
+    out += np.bincount(keys % m, (c + dc) ** 2 - c ** 2,
+      minlength=m).astype(np.int64)
+  return out
+
+def cluster_sharded(paths, m, max_iter=10, n_jobs=None):
+  # pass 1: greedy cluster() labels the first shard, then the other
+  # shards are labelled in parallel against its counts
+  # each later pass proposes new labels for all shards in parallel
+  # against the merged totals of the previous pass, then folds the
+  # proposals in shard by shard, keeping one only if it raises CU
+  # given the proposals already kept; CU never decreases, and the
+  # loop ends after a pass that keeps no moves, or max_iter passes
+  # totals go to <shard dir>/totals*.npy for the workers, labels
+  # next to the shards; returns (cu, rows moved in each pass)
+  prefix = os.path.join(os.path.dirname(os.path.abspath(paths[0])),
+    'totals')
+  for p in paths:  # start every shard unlabelled
+    for q in (_labels_path(p), _next_path(p)):
+      if os.path.exists(q):
+        os.remove(q)
+
+  X0 = np.load(paths[0], mmap_mode='r')
+  labels = np.array(cluster(np.asarray(X0).tolist(), m), dtype=np.int64)
+  np.save(_labels_path(paths[0]), labels.astype(code_dtype(m)))
+  counts = _counts(X0, labels, m)
+  _save_totals(counts, _sums(counts, m)[1], prefix)
+  results = _map(_propose_shard, [(p, prefix) for p in paths[1:]], n_jobs)
+  counts = merge_counts([counts] + [c for c, moves in results])
+  history = [len(labels) + sum(moves for c, moves in results)]
+  un_sum_sq, k_sum_sq = _sums(counts, m)
+  cu = _cu(counts[0], un_sum_sq, k_sum_sq, m)
+
+  for it in range(1, max_iter):
+    _save_totals(counts, k_sum_sq, prefix)
+    results = _map(_propose_shard, [(p, prefix) for p in paths], n_jobs)
+    sizes = counts[0]
+    pending = None  # kept changes, merged
+    moved = 0
+    for p, (delta, moves) in zip(paths, results):
+      if delta is None:
+        continue
+      new_sizes = sizes + delta[0]
+      new_k = k_sum_sq + _moved_sum_sq(counts, pending, delta, m)
+      new_cu = _cu(new_sizes, un_sum_sq, new_k, m)
+      if np.all(new_sizes > 0) and new_cu - cu > 1e-12 * abs(cu):
+        os.replace(_next_path(p), _labels_path(p))
+        sizes, k_sum_sq, cu = new_sizes, new_k, new_cu
+        pending = delta if pending is None else \
+          _drop_zeros(merge_counts([pending, delta]))
+        moved += moves
+      else:
+        os.remove(_next_path(p))
+    history.append(moved)
+    if moved == 0:
+      break
+    counts = _drop_zeros(merge_counts([counts, pending]))
+  return cu, history
@@ -0,0 +1,16 @@
+# conftest.py
+# shared test data: dados100-final.csv encoded with CatEncoder
+
+import os
+
+import pytest
+
+from cat_encoder import CatEncoder
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+  'dados100-final.csv')
+
+@pytest.fixture(scope='session')
+def ds():
+  enc = CatEncoder()
+  return enc.matrix(enc.encode_csv(DATA)).tolist()
@@ -0,0 +1,102 @@
+# test_cat_cluster.py
+# checks of cat_cluster against the original pure-Python code
+# on dados100-final.csv
+#
+#   python -m pytest -q test_cat_cluster.py
+
+import numpy as np
+import pytest
+
+from cat_cluster import Probe, cat_utility, cat_utility_np, cluster, \
+  cluster_unique, collapse_rows, expand_labels, refine
+
+def _labels(n, m, seed):
+  # random labels with every cluster used
+  rng = np.random.RandomState(seed)
+  labels = rng.randint(0, m, n)
+  labels[:m] = np.arange(m)
+  return labels.tolist()
+
+@pytest.mark.parametrize('m', [2, 3, 5])
+def test_cat_utility_np_single(ds, m):
+  labels = _labels(len(ds), m, m)
+  assert np.allclose(cat_utility_np(ds, labels, m),
+    cat_utility(ds, labels, m), rtol=0, atol=1e-12)
+
+def test_cat_utility_np_batch(ds):
+  m = 4
+  batch = [_labels(len(ds), m, s) for s in range(6)]
+  cus = cat_utility_np(ds, np.array(batch), m)
+  assert cus.shape == (6,)
+  assert np.allclose(cus, [cat_utility(ds, l, m) for l in batch],
+    rtol=0, atol=1e-12)
+
+def test_cat_utility_np_weighted(ds):
+  m = 3
+  labels = _labels(len(ds), m, 1)
+  weights = np.random.RandomState(2).randint(1, 5, len(ds)).tolist()
+  assert np.allclose(cat_utility_np(ds, labels, m, weights),
+    cat_utility(ds, labels, m, weights), rtol=0, atol=1e-12)
+
+def test_cat_utility_np_empty_cluster(ds):
+  m = 3
+  labels = [i % 2 for i in range(len(ds))]  # cluster 2 has no items
+  assert cat_utility(ds, labels, m) == 0.0
+  assert cat_utility_np(ds, labels, m) == 0.0
+  batch = np.array([labels, _labels(len(ds), m, 0)])
+  cus = cat_utility_np(ds, batch, m)
+  assert cus[0] == 0.0 and cus[1] > 0.0
+
+def _greedy_reference(ds, m):
+  # the original cluster(): CU of every proposed clustering
+  # recomputed from scratch, best one by float argmax
+  working_set = [list(ds[k]) for k in range(m)]
+  clustering = list(range(m))
+  for i in range(m, len(ds)):
+    working_set.append(ds[i])
+    proposed_cus = [cat_utility(working_set, clustering + [k], m)
+      for k in range(m)]
+    clustering.append(int(np.argmax(proposed_cus)))
+  return clustering
+
+@pytest.mark.parametrize('m', [2, 3, 5])
+def test_cluster_matches_reference(ds, m):
+  labels = cluster(ds, m)
+  assert labels == _greedy_reference(ds, m)
+
+def test_weighted_cu_on_collapsed_rows(ds):
+  # each row repeated, so collapsing actually merges rows
+  full = [r for r in ds for _ in range(3)] + ds[:7]
+  uniq, counts, inverse = collapse_rows(full)
+  assert [uniq[j] for j in inverse] == full
+  m = 3
+  labels = cluster(uniq, m, 0, counts)
+  expanded = expand_labels(labels, inverse)
+  assert np.isclose(cat_utility(uniq, labels, m, counts),
+    cat_utility(full, expanded, m), rtol=0, atol=1e-12)
+  assert np.isclose(cat_utility_np(uniq, labels, m, counts),
+    cat_utility_np(full, expanded, m), rtol=0, atol=1e-12)
+  assert cluster_unique(full, m) == expanded
+
+def test_refine_passes(ds):
+  m = 3
+  labels = cluster(ds, m)
+  before = list(labels)
+  assert refine(ds, labels, m, max_iter=0) == 0
+  assert labels == before
+  passes = refine(ds, labels, m, max_iter=10)
+  assert 1 <= passes <= 10
+  assert cat_utility(ds, labels, m) >= cat_utility(ds, before, m) - 1e-12
+
+def test_probe(ds):
+  m = 3
+  steps = []
+  probe = Probe(lambda i, k, cu: steps.append(i) or i >= 40, every=10)
+  labels = cluster(ds, m, 5, probe=probe)
+  assert steps == [10, 20, 30, 40] and probe.stopped
+  assert labels == cluster(ds, m)[:41]
+  probe = Probe()
+  assert refine(ds, cluster(ds, m), m, max_iter=0, probe=probe) == 0
+  assert 'refine' in probe.seconds
+  with pytest.raises(ValueError):
+    Probe(every=0)
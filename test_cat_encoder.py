@@ -0,0 +1,79 @@
+# test_cat_encoder.py
+# checks of CatEncoder vocabularies on dados100-final.csv
+#
+#   python -m pytest -q test_cat_encoder.py
+
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cat_encoder
+from cat_encoder import FEATURES, UNSEEN, CatEncoder, cached_codes
+from conftest import DATA
+
+def _frame():
+  return pd.read_csv(DATA, delimiter=';', dtype=str, keep_default_na=False)
+
+def test_codes_first_seen_order():
+  df = _frame()
+  enc = CatEncoder()
+  X = enc.encode_rows(df[FEATURES].values.tolist())
+  for i, c in enumerate(FEATURES):
+    codes, uniques = pd.factorize(df[c])
+    assert X[:, i].tolist() == (codes + 1).tolist()
+    assert enc.vocab[i] == list(uniques)
+
+def test_unseen_values():
+  df = _frame()
+  enc = CatEncoder()
+  enc.encode_frame(df[:50])
+  vocab = [list(v) for v in enc.vocab]
+  rows = df[FEATURES].values.tolist()
+  rows[0] = ['never seen'] * len(FEATURES)
+  X = enc.encode_rows(rows, learn=False)
+  assert X[0].tolist() == [UNSEEN] * len(FEATURES)
+  assert enc.vocab == vocab  # learn=False leaves the vocabularies
+  known = enc.encode_rows(df[FEATURES].values.tolist()[:50], learn=False)
+  assert (known != UNSEEN).all()
+
+def test_save_load(tmp_path):
+  df = _frame()
+  enc = CatEncoder()
+  enc.encode_frame(df[:60])
+  path = str(tmp_path / 'vocab.json')
+  enc.save(path)
+  loaded = CatEncoder.load(path)
+  assert loaded.columns == enc.columns and loaded.vocab == enc.vocab
+  rest = df[FEATURES].values.tolist()[60:]
+  assert (loaded.encode_rows(rest, learn=False) ==
+    enc.encode_rows(rest, learn=False)).all()
+  assert (loaded.encode_rows(rest) == enc.encode_rows(rest)).all()
+  assert loaded.vocab == enc.vocab
+
+def test_cached_codes(tmp_path, monkeypatch):
+  cache = str(tmp_path / 'cache')
+  X, enc = cached_codes(DATA, cache_dir=cache)
+  ref = CatEncoder()
+  assert (X == ref.matrix(ref.encode_csv(DATA))).all()
+  assert enc.vocab == ref.vocab
+  assert isinstance(X, np.memmap) and not X.flags.writeable
+  with pytest.raises(ValueError):
+    X[0, 0] = 1
+
+  # the second call reads the cache instead of re-encoding
+  def fail(*args, **kwargs):
+    raise AssertionError('re-encoded a cached file')
+  monkeypatch.setattr(cat_encoder.CatEncoder, 'encode_csv', fail)
+  Y, enc2 = cached_codes(DATA, cache_dir=cache)
+  assert Y.filename == X.filename and (Y == X).all()
+  assert enc2.vocab == enc.vocab
+
+  # changed content gets its own cache entry
+  copy = str(tmp_path / 'copy.csv')
+  shutil.copy(DATA, copy)
+  with open(copy, 'a') as f:
+    f.write(open(DATA).read().splitlines()[1] + '\n')
+  with pytest.raises(AssertionError):
+    cached_codes(copy, cache_dir=cache)
@@ -0,0 +1,47 @@
+# test_cat_online.py
+# checks of the online CUModel against cluster() on the full data
+#
+#   python -m pytest -q test_cat_online.py
+
+import numpy as np
+import pytest
+
+from cat_cluster import CUEngine, cat_utility, cluster
+from cat_online import CUModel
+
+@pytest.mark.parametrize('m,split', [(2, 10), (3, 40), (5, 70)])
+def test_partial_fit_matches_cluster(ds, m, split):
+  model, labels = CUModel.fit(ds[:split], m)
+  labels += model.partial_fit(ds[split:])
+  assert labels == cluster(ds, m)
+  assert np.isclose(model.cu(), cat_utility(ds, labels, m), rtol=0,
+    atol=1e-12)
+
+def test_predict_leaves_counts(ds):
+  m = 3
+  model, labels = CUModel.fit(ds[:60], m)
+  before = model.cu()
+  predicted = model.predict(ds[60:])
+  assert model.cu() == before
+  assert model.partial_fit(ds[60:61]) == predicted[:1]
+
+def test_save_load(ds, tmp_path):
+  m = 3
+  model, labels = CUModel.fit(ds[:50], m)
+  path = str(tmp_path / 'model.pkl')
+  model.save(path)
+  loaded = CUModel.load(path)
+  assert loaded.cu() == model.cu()
+  assert loaded.partial_fit(ds[50:]) == model.partial_fit(ds[50:])
+  assert loaded.cu() == model.cu()
+
+def test_window(ds):
+  # counts cover exactly the last window rows and their labels
+  m, window = 3, 30
+  model, labels = CUModel.fit(ds[:40], m, window=window)
+  labels += model.partial_fit(ds[40:])
+  assert sum(model.eng.cluster_cts) == window
+  ref = CUEngine.from_clustering(ds[-window:], labels[-window:], m)
+  assert model.eng.cluster_cts == ref.cluster_cts
+  assert model.eng.k_sum_sq == ref.k_sum_sq
+  assert model.cu() == ref.cu()
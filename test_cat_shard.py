@@ -0,0 +1,58 @@
+# test_cat_shard.py
+# checks of the sharded map-reduce counts and passes against
+# cat_utility() on dados100-final.csv split into 25-row shards
+#
+#   python -m pytest -q test_cat_shard.py
+
+import os
+
+import numpy as np
+import pytest
+
+from cat_cluster import CUEngine, cat_utility
+from cat_shard import _counts, _sums, cluster_sharded, counts_cu, \
+  merge_counts, shard_labels
+
+ROWS = 25  # rows per shard
+
+def _shards(ds, out_dir):
+  X = np.array(ds, dtype=np.int8)
+  paths = []
+  for s in range(0, len(X), ROWS):
+    p = os.path.join(out_dir, 'shard-%05d.npy' % len(paths))
+    np.save(p, X[s:s + ROWS])
+    paths.append(p)
+  return paths
+
+@pytest.mark.parametrize('m', [2, 3, 5])
+def test_merged_counts(ds, m):
+  labels = np.random.RandomState(m).randint(0, m, len(ds))
+  labels[:m] = np.arange(m)
+  X = np.array(ds)
+  parts = [_counts(X[s:s + ROWS], labels[s:s + ROWS], m)
+    for s in range(0, len(X), ROWS)]
+  counts = merge_counts(parts)
+  eng = CUEngine.from_clustering(ds, labels.tolist(), m)
+  un_sum_sq, k_sum_sq = _sums(counts, m)
+  assert un_sum_sq == eng.un_sum_sq
+  assert k_sum_sq.tolist() == eng.k_sum_sq
+  assert counts[0].tolist() == eng.cluster_cts
+  assert np.isclose(counts_cu(counts, m), cat_utility(ds, labels, m),
+    rtol=0, atol=1e-12)
+
+@pytest.mark.parametrize('m', [2, 3, 5])
+def test_cluster_sharded(ds, m, tmp_path):
+  paths = _shards(ds, str(tmp_path))
+  prev = None
+  for max_iter in range(1, 30):
+    cu, history = cluster_sharded(paths, m, max_iter, n_jobs=1)
+    labels = shard_labels(paths).tolist()
+    assert len(labels) == len(ds)
+    assert np.isclose(cu, cat_utility(ds, labels, m), rtol=0, atol=1e-12)
+    if prev is not None:  # one more pass never lowers CU
+      assert cu >= prev - 1e-12
+    prev = cu
+    if history[-1] == 0:
+      break
+  assert history[-1] == 0  # converged
+  assert not [f for f in os.listdir(str(tmp_path)) if '.next.' in f]
@@ -4,6 +4,8 @@
 
 import numpy as np
 
+from cat_encoder import FEATURES, CatEncoder
+
 def cat_utility(ds, clustering, m):
   # category utility of clustering of dataset ds
   n = len(ds)  # number items
@@ -228,8 +230,9 @@ def main():
 ['99','false','4','2','183.57.104.170','it','false','Linux','false','Europe/Roma','false','Chrome','95.0.4641','nvidia geforce rtx 3080 founders','b0e9d90f3c1dbccc0dc8e2265098030b','0.562500000000001'],
 ['100','true','4','2','183.57.104.170','it','true','Windows 10','true','Europe/Napoli','false','Opera?','80.0.4170','nvidia geforce rtx 3080 founders','e4948a1f77d1f0ed9cd8320efbeda718','0.5340000000000007']]
   
-  # in non-demo scenario, programmtically encode
-  enc_data = [[1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0],[2,0,1,1,1,0,0,1,0,0,0,1,1,1,1,1],[3,0,0,0,2,0,0,0,0,0,0,0,0,0,2,2],[4,1,1,0,3,0,0,0,0,0,0,2,1,1,0,3],[5,1,2,2,4,0,1,1,0,0,0,1,1,1,0,4],[6,0,1,1,5,0,0,1,0,0,0,0,0,1,0,5],[7,1,0,0,6,0,0,0,0,0,0,0,1,0,3,6],[8,0,0,0,7,0,0,0,0,0,0,0,0,0,4,7],[9,1,2,3,8,0,1,1,0,0,0,1,1,1,0,8],[10,1,1,2,9,0,0,0,0,0,0,0,2,2,5,4],[11,1,1,0,10,0,0,0,0,0,0,0,3,3,6,9],[12,1,3,2,11,1,0,2,0,1,0,3,4,4,7,10],[13,0,0,2,12,1,0,2,1,1,0,2,5,5,8,11],[14,1,1,1,13,1,1,3,0,2,1,1,6,6,9,12],[15,1,3,4,14,1,0,2,0,3,0,2,7,5,10,13],[16,1,3,4,15,1,1,2,0,4,0,1,8,4,11,14],[17,0,4,4,16,1,1,0,0,3,0,1,9,7,12,15],[18,0,0,2,17,1,0,4,0,2,1,0,0,8,13,16],[19,0,1,0,18,1,1,3,0,5,1,0,10,9,14,17],[20,1,3,5,19,1,0,5,0,6,0,0,0,7,15,18],[21,1,3,5,20,1,0,5,0,7,0,0,0,10,16,19],[22,1,4,4,21,2,0,5,0,8,0,1,1,11,17,20],[23,0,0,1,22,2,0,2,0,9,0,2,2,10,18,20],[24,1,3,5,23,2,0,2,0,9,0,4,4,11,19,21],[25,1,0,2,24,2,1,3,0,10,1,0,0,12,20,22],[26,1,0,2,24,2,1,3,0,10,1,0,0,12,20,23],[27,1,0,2,24,2,1,3,0,10,1,0,0,12,20,24],[28,1,0,2,24,2,1,3,0,10,1,0,0,12,20,24],[29,1,0,1,25,2,0,1,0,11,0,1,11,13,21,24],[30,1,0,1,26,2,0,6,0,11,1,5,12,14,22,24],[31,1,0,2,27,3,1,7,0,12,0,2,13,0,23,25],[32,0,0,2,28,3,1,7,0,12,0,4,4,4,24,26],[33,0,0,1,29,3,0,0,0,13,0,1,14,0,25,27],[34,1,3,5,30,3,1,4,0,14,1,0,15,15,26,28],[35,0,0,1,29,3,0,0,0,13,0,1,14,0,25,29],[36,0,3,3,31,3,0,6,1,15,1,5,16,16,27,30],[37,0,1,0,32,3,0,3,1,15,1,0,17,8,28,29],[38,1,0,2,24,2,1,3,0,10,1,0,0,12,20,31],[39,1,0,2,24,2,1,3,0,10,1,0,0,12,20,32],[40,1,3,5,33,4,1,0,0,16,0,1,3,4,29,24],[41,1,4,5,34,4,1,2,0,16,0,0,0,17,30,24],[42,1,3,4,35,4,1,0,0,17,0,4,5,18,31,33],[43,0,4,4,36,4,1,0,0,17,0,1,18,5,32,34],[44,0,4,5,37,4,1,2,0,17,0,0,0,17,30,35],[45,1,4,6,38,4,0,3,0,18,1,2,3,19,33,36],[46,0,4,4,39,4,0,2,1,19,0,0,0,17,34,37],[47,1,4,4,40,4,0,2,0,20,0,1,3,17,34,38],[48,1,3,5,41,4,0,3,0,20,1,0,19,20,35,12],[49,0,3,5,42,5,1,5,0,21,0,1,20,18,36,39],[50,0,4,4,43,5,1,8,0,21,1,0,21,21,37,40],[51,0,4,4,44,5,1,5,0,22,0,1,22,5,32,41],[52,1,3,5,45,5,1,2,0,22,0,0,0,4,38,42],[53,1,4,4,46,5,1,2,0,22,0,1,3,5,32,43],[54,1,3,2,47,5,1,2,0,22,0,4,23,22,39,44],[55,1,4,4,48,5,0,9,0,23,1,4,24,23,40,45],[56,1,0,2,49,5,1,2,0,23,0,0,0,4,41,46],[57,1,3,5,50,5,1,0,0,23,0,4,25,4,42,47],[58,0,0,2,51,5,1,2,1,23,0,4,25,24,43,48],[59,1,0,2,52,5,1,0,0,24,0,4,25,24,44,49],[60,0,3,5,53,5,0,3,0,24,1,2,26,23,45,50],[61,1,3,3,54,5,0,10,0,24,1,5,27,25,46,51],[62,1,4,4,55,6,1,2,0,25,0,4,25,24,47,52],[63,1,4,5,56,6,1,2,0,25,0,0,0,26,48,53],[64,1,4,4,57,6,1,2,0,26,0,4,25,24,47,54],[65,1,0,1,58,6,1,0,0,26,0,2,26,17,49,55],[66,0,0,1,59,6,1,0,0,26,0,0,0,17,49,56],[67,0,3,5,60,6,1,0,0,27,0,0,0,4,29,57],[68,1,3,2,61,6,1,0,0,27,0,1,3,27,50,58],[69,1,4,5,62,6,1,2,0,28,0,0,19,28,51,59],[70,1,4,5,63,6,1,2,0,28,0,1,20,28,51,60],[71,1,0,1,64,7,1,5,0,29,0,0,0,29,52,61],[72,0,0,1,65,7,0,3,1,30,1,0,3,23,53,62],[73,1,0,2,66,7,0,6,0,31,1,5,28,30,54,63],[74,1,3,5,67,7,0,7,0,32,0,4,25,31,55,64],[75,1,3,5,68,7,0,8,0,33,1,0,26,19,56,65],[76,1,3,2,69,7,0,8,1,34,1,0,29,32,57,66],[77,1,0,1,70,7,0,1,1,34,0,0,0,33,58,67],[78,0,0,1,71,7,0,1,1,29,0,0,0,33,58,68],[79,1,3,5,72,8,1,2,0,35,0,0,30,4,59,69],[80,1,0,1,73,8,1,2,0,35,0,0,31,34,60,70],[81,0,1,0,74,8,1,5,0,36,0,0,32,26,61,71],[82,1,3,4,75,8,1,5,0,36,0,0,0,35,62,72],[83,1,1,0,76,8,0,5,0,37,0,0,19,36,63,73],[84,1,1,0,77,8,1,5,0,37,0,0,0,37,64,74],[85,0,0,1,78,8,1,5,0,37,0,4,21,33,65,75],[86,1,0,2,24,2,1,3,0,10,1,0,0,12,20,76],[87,0,3,5,79,9,0,3,0,38,1,0,3,19,66,77],[88,1,0,2,80,9,0,7,0,39,0,0,19,27,67,78],[89,1,0,2,81,9,0,0,1,40,0,0,20,26,68,79],[90,0,1,1,82,9,0,0,0,40,0,4,33,38,69,80],[91,1,3,5,83,9,0,0,0,41,0,4,34,4,29,81],[92,1,0,2,84,10,0,7,0,42,0,4,35,27,70,82],[93,1,3,2,85,10,0,2,0,43,0,4,1,38,71,83],[94,0,0,1,86,10,0,11,1,44,1,5,36,39,72,84],[95,1,1,0,87,10,1,1,1,42,0,4,33,27,70,85],[96,0,1,0,88,10,0,3,0,45,1,0,3,32,73,86],[97,0,1,0,88,10,0,3,0,45,1,0,3,32,73,87],[98,1,5,1,83,11,0,3,1,46,1,0,19,40,74,88],[99,0,1,0,89,11,1,2,1,46,0,0,20,28,75,88],[100,1,1,0,89,11,0,0,0,47,0,4,1,28,76,89]]
+  # learn one vocabulary per column and encode programmatically
+  columns = ['usuario_id'] + FEATURES + ['score']
+  enc_data = CatEncoder(columns).encode_rows(raw_data).tolist()
 
   print("\nDados sem tratamento: ")
   for item in raw_data: